@@ -1,13 +1,15 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 import httpx
-from routes import users, rides, places, communities, messaging
 from dotenv import load_dotenv
 
-# Load environment variables from .env file
+# Load environment variables from .env file before importing the routes, since
+# modules such as utils.email_utils read their configuration at import time
 import os
 load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), '.env'))
 
+from routes import users, rides, places, communities, messaging
+
 app = FastAPI()
 
 # Database
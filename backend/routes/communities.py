@@ -22,10 +22,11 @@ async def get_community_options(current_user: dict = Depends(get_current_user))
                 detail="User not found"
             )
         
-        # Check if user has university_info (from AI detection)
+        # Check if user has university_info (from AI detection); legacy colleges
+        # use the hardcoded community lists below
         university_info = user_doc.get('university_info')
         
-        if university_info:
+        if university_info and not university_info.get('legacy'):
             # Use AI-powered community detection
             communities = university_service.get_community_options_for_university(university_info)
             
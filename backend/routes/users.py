@@ -2,7 +2,7 @@
 from fastapi import APIRouter, HTTPException, status, Depends
 from models import User, UserSignUp, UserLogin, EmailVerification, ResendVerification, ForgotPassword, ResetPassword, UserProfileUpdate, UserProfileResponse, ProfilePictureUpload
 from database import users_collection, rides_collection
-from utils.email_utils import validate_college_email, generate_verification_code, get_verification_expiry, send_verification_email, generate_reset_code, get_reset_expiry, send_password_reset_email
+from utils.email_utils import validate_college_email_async, generate_verification_code, get_verification_expiry, send_verification_email, claim_verification_send, generate_reset_code, get_reset_expiry, send_password_reset_email
 from utils.auth_utils import hash_password, verify_password, create_access_token, get_current_user
 from datetime import datetime, timedelta
 from collections import Counter
@@ -16,7 +16,7 @@ async def sign_up(user_data: UserSignUp):
     """Sign up a new user with email verification"""
     
     # Validate college email with AI-powered detection
-    email_validation = validate_college_email(user_data.email)
+    email_validation = await validate_college_email_async(user_data.email)
     if not email_validation['valid']:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -32,23 +32,26 @@ async def sign_up(user_data: UserSignUp):
                 detail="An account with this email already exists. Please use the login screen or try 'Forgot Password' if you can't remember your password"
             )
         else:
-            # User exists but not verified, update verification code
-            verification_code = generate_verification_code()
-            verification_expires = get_verification_expiry()
+            # User exists but not verified, update their details
+            updates = {
+                "password": hash_password(user_data.password),
+                "college": email_validation['college']  # Update with AI-detected college
+            }
+            
+            # Issue a new code unless one was just sent, in which case it stays valid
+            send_new_code = claim_verification_send(user_data.email)
+            if send_new_code:
+                verification_code = generate_verification_code()
+                updates["verification_code"] = verification_code
+                updates["verification_expires"] = get_verification_expiry()
             
             await users_collection.update_one(
                 {"email": user_data.email.lower()},
-                {
-                    "$set": {
-                        "verification_code": verification_code,
-                        "verification_expires": verification_expires,
-                        "password": hash_password(user_data.password),
-                        "college": email_validation['college']  # Update with AI-detected college
-                    }
-                }
+                {"$set": updates}
             )
             
-            send_verification_email(user_data.email, verification_code, email_validation['college'])
+            if send_new_code:
+                send_verification_email(user_data.email, verification_code, email_validation['college'])
             
             return {
                 "message": "Verification email sent",
@@ -78,6 +81,7 @@ async def sign_up(user_data: UserSignUp):
     await users_collection.insert_one(user.dict())
     
     # Send verification email
+    claim_verification_send(user_data.email)
     send_verification_email(user_data.email, verification_code, email_validation['college'])
     
     return {
@@ -158,6 +162,10 @@ async def resend_verification(resend_data: ResendVerification):
             detail="Email already verified"
         )
     
+    # A code was just sent; keep it instead of issuing another
+    if not claim_verification_send(resend_data.email):
+        return {"message": "Verification email sent"}
+    
     # Generate new verification code
     verification_code = generate_verification_code()
     verification_expires = get_verification_expiry()
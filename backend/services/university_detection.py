@@ -89,7 +89,9 @@ class UniversityDetectionService:
             email: User's email address
             
         Returns:
-            Dictionary with university information or error
+            Dictionary with university information or error. Failed lookups
+            (AI errors, unparseable responses) also set 'service_error': True,
+            so callers can tell them apart from a domain that isn't a university
         """
         try:
             # Extract domain
@@ -128,7 +130,8 @@ class UniversityDetectionService:
             logging.error(f"Error in university detection: {e}")
             return {
                 'valid': False,
-                'error': 'Unable to detect university information'
+                'error': 'Unable to detect university information',
+                'service_error': True
             }
     
     def _query_groq_for_university(self, domain: str) -> Dict[str, any]:
@@ -194,7 +197,8 @@ class UniversityDetectionService:
                 else:
                     return {
                         'valid': False,
-                        'error': 'Incomplete university information received'
+                        'error': 'Incomplete university information received',
+                        'service_error': True
                     }
             else:
                 return {
@@ -206,13 +210,15 @@ class UniversityDetectionService:
             logging.error(f"JSON parsing error: {e}")
             return {
                 'valid': False,
-                'error': 'Invalid response format from AI service'
+                'error': 'Invalid response format from AI service',
+                'service_error': True
             }
         except Exception as e:
             logging.error(f"Groq API error: {e}")
             return {
                 'valid': False,
-                'error': 'University detection service temporarily unavailable'
+                'error': 'University detection service temporarily unavailable',
+                'service_error': True
             }
     
     def _get_nearby_universities(self, university_info: Dict[str, any]) -> List[Dict[str, any]]:
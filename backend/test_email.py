@@ -57,7 +57,7 @@ def test_email_functionality():
         print("   🖥️  SendGrid not configured - will use console fallback")
     
     try:
-        result = send_verification_email(test_email, test_code, test_college)
+        result = send_verification_email(test_email, test_code, test_college, force_immediate=True)
         if result:
             print("   ✅ Email function executed successfully")
         else:
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Test script for the verification email queue
+Checks the exit flush, SendGrid status classification and resend dedupe
+without sending any real email. Run from the backend directory.
+"""
+
+import os
+import subprocess
+import sys
+import time
+
+# Add the current directory to Python path to import our modules
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from cachetools import TTLCache
+import utils.email_utils as email_utils
+
+# Queues one email with SendGrid batching forced on, then exits normally
+FLUSH_SCRIPT = """
+import utils.email_utils as email_utils
+email_utils._use_sendgrid_batches = lambda: True
+email_utils._send_verification_batch = lambda recipients: (
+    print("SENT", *[email for email, code, college in recipients]) or email_utils.SendResult(ok=True, status=202)
+)
+email_utils.send_verification_email("student@pomona.edu", "123456", "Pomona College")
+"""
+
+def test_flush_on_exit() -> bool:
+    """A queued verification email must be sent before the process exits"""
+    print("1. Testing queued email is sent at exit...")
+    backend_dir = os.path.dirname(os.path.abspath(__file__))
+    result = subprocess.run(
+        [sys.executable, "-c", FLUSH_SCRIPT],
+        cwd=backend_dir, capture_output=True, text=True, timeout=60
+    )
+    ok = "SENT student@pomona.edu" in result.stdout
+    print(f"   {'✅' if ok else '❌'} exit code {result.returncode}, output: {result.stdout.strip() or 'none'}")
+    return ok
+
+def test_send_result_classification() -> bool:
+    """2xx is success, 429/5xx/network errors are retryable, other 4xx are permanent"""
+    print("\n2. Testing SendGrid status classification...")
+    cases = [
+        (202, True, False),
+        (400, False, False),
+        (401, False, False),
+        (429, False, True),
+        (503, False, True),
+        (None, False, True),
+    ]
+    all_ok = True
+    for status, expected_ok, expected_retryable in cases:
+        result = email_utils._send_result(status)
+        ok = result.ok == expected_ok and result.retryable == expected_retryable and bool(result) == expected_ok
+        all_ok = all_ok and ok
+        print(f"   {'✅' if ok else '❌'} status {status}: ok={result.ok} retryable={result.retryable}")
+    return all_ok
+
+def test_claim_verification_send() -> bool:
+    """A second claim inside the resend window is refused; after it expires it succeeds"""
+    print("\n3. Testing verification resend window...")
+    original = email_utils._recent_verification_sends
+    email_utils._recent_verification_sends = TTLCache(maxsize=100, ttl=0.2)
+    try:
+        first = email_utils.claim_verification_send("student@pomona.edu")
+        repeat = email_utils.claim_verification_send("Student@Pomona.edu")
+        time.sleep(0.3)
+        after_window = email_utils.claim_verification_send("student@pomona.edu")
+    finally:
+        email_utils._recent_verification_sends = original
+
+    ok = first and not repeat and after_window
+    print(f"   {'✅' if ok else '❌'} first={first} repeat={repeat} after_window={after_window}")
+    return ok
+
+if __name__ == "__main__":
+    print("🧪 Testing Campus Mobility Verification Email Queue\n")
+    results = [
+        test_flush_on_exit(),
+        test_send_result_classification(),
+        test_claim_verification_send(),
+    ]
+    print(f"\n📋 {sum(results)}/{len(results)} checks passed")
+    sys.exit(0 if all(results) else 1)
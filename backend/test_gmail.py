@@ -34,7 +34,8 @@ def test_verification_email(recipient_email: str):
     success = send_verification_email(
         email=recipient_email,
         code="123456",
-        college="Test College"
+        college="Test College",
+        force_immediate=True
     )
     
     print(f"Result: {'SUCCESS' if success else 'FAILED'}")
@@ -48,7 +49,8 @@ def test_password_reset_email(recipient_email: str):
     success = send_password_reset_email(
         email=recipient_email,
         reset_code="654321",
-        college="Test College"
+        college="Test College",
+        force_immediate=True
     )
     
     print(f"Result: {'SUCCESS' if success else 'FAILED'}")
@@ -1,13 +1,44 @@
+from __future__ import annotations
+
 import bcrypt
 import jwt
-from datetime import datetime, timedelta
+import hashlib
+import ssl
+import time
 from typing import Dict, Optional
 import os
+import logging
 from fastapi import HTTPException, status, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 
+logger = logging.getLogger(__name__)
+
 SECRET_KEY = os.getenv("JWT_SECRET", "your-secret-key-change-in-production")
 ALGORITHM = "HS256"
+ACCESS_TOKEN_TTL_SECONDS = int(os.getenv("JWT_TTL_DAYS", "30")) * 86400
+
+# Decode arguments are fixed for the life of the process, so build them once.
+# We only issue our own tokens and they carry just exp and user fields, so the
+# aud/iss/nbf/iat claim checks are skipped
+_SECRET_KEY_BYTES = SECRET_KEY.encode('utf-8')
+_DECODE_ALGORITHMS = (ALGORITHM,)
+_DECODE_OPTIONS = {
+    "verify_signature": True,
+    "verify_exp": True,
+    "verify_aud": False,
+    "verify_iss": False,
+    "verify_nbf": False,
+    "verify_iat": False,
+    "require": ["exp"],
+}
+
+# PyJWT signs HS256 with hmac.new(key, msg, hashlib.sha256). When hashlib is
+# OpenSSL-backed this runs in OpenSSL's HMAC, which uses the CPU's SHA
+# extensions where available
+if hashlib.sha256.__module__ == '_hashlib':
+    logger.debug("JWT HS256 signing uses %s", ssl.OPENSSL_VERSION)
+else:
+    logger.warning("hashlib is not OpenSSL-backed; JWT HS256 uses the builtin SHA-256")
 
 def hash_password(password: str) -> str:
     """Hash a password using bcrypt"""
@@ -20,19 +51,18 @@ def verify_password(password: str, hashed: str) -> bool:
 def create_access_token(data: Dict) -> str:
     """Create a JWT access token"""
     to_encode = data.copy()
-    expire = datetime.utcnow() + timedelta(days=30)  # Token expires in 30 days
-    to_encode.update({"exp": expire})
+    # exp is a Unix timestamp; 30 days out unless JWT_TTL_DAYS is set
+    to_encode["exp"] = int(time.time()) + ACCESS_TOKEN_TTL_SECONDS
     
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
 def verify_token(token: str) -> Optional[Dict]:
     """Verify and decode a JWT token"""
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = jwt.decode(token, _SECRET_KEY_BYTES, algorithms=_DECODE_ALGORITHMS, options=_DECODE_OPTIONS)
         return payload
-    except jwt.ExpiredSignatureError:
-        return None
-    except (jwt.PyJWTError, jwt.DecodeError):
+    except jwt.InvalidTokenError:
+        # Covers expired, malformed and badly signed tokens
         return None
 
 # Security scheme for dependency injection
@@ -43,17 +73,13 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
     token = credentials.credentials
     payload = verify_token(token)
     
-    print(f"🔍 DEBUG get_current_user:")
-    print(f"  Token: {token[:20]}...")
-    print(f"  Payload: {payload}")
-    
     if payload is None:
-        print(f"❌ Token validation failed")
+        logger.debug("get_current_user: token validation failed for token=%s...", token[:20])
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid or expired token",
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    print(f"✅ Token valid, user: {payload.get('email', 'NO_EMAIL')}")
+    logger.debug("get_current_user: token valid for user=%s", payload.get('email'))
     return payload
\ No newline at end of file
@@ -1,32 +1,155 @@
-import random
+import asyncio
+import atexit
+import html
+import importlib.util
+import re
+import secrets
 import string
+import sys
+import textwrap
 from datetime import datetime, timedelta
-from typing import Dict, Optional
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from functools import lru_cache, partial
+from types import MappingProxyType
+from typing import Dict, List, Mapping, Optional, Tuple
 import os
 import logging
+import httpx
+from cachetools import TTLCache
+import queue
+import threading
+import time
 
-# Import Gmail service
-try:
+logger = logging.getLogger(__name__)
+
+# Gmail and SendGrid pull in large client libraries, so they are only imported
+# on first send; availability is checked without importing them
+GMAIL_AVAILABLE = importlib.util.find_spec("googleapiclient") is not None
+if not GMAIL_AVAILABLE:
+    logger.warning("Gmail API not available")
+
+SENDGRID_AVAILABLE = importlib.util.find_spec("sendgrid") is not None
+if not SENDGRID_AVAILABLE:
+    logger.warning("SendGrid not available - emails will be logged instead")
+
+VERIFICATION_EMAIL_SUBJECT = "🚗 Campus Mobility - Verify Your Email"
+PASSWORD_RESET_EMAIL_SUBJECT = "🔐 Campus Mobility - Password Reset Request"
+
+# SendGrid accepts at most 1000 personalizations per request
+SENDGRID_MAX_PERSONALIZATIONS = 1000
+
+# Rate-limited (429), 5xx and network failures are retried with exponential
+# backoff: 0.5s, then 1s
+SENDGRID_MAX_ATTEMPTS = 3
+SENDGRID_RETRY_BASE_DELAY = 0.5
+
+# Seconds before a SendGrid request is abandoned. Sends run on a few shared
+# threads, so one stalled connection must not block them indefinitely
+SENDGRID_TIMEOUT = 10
+
+# Messages are still built with the SendGrid helper classes, but posted over
+# one pooled keep-alive client; the SDK's transport opens a new connection for
+# every request
+SENDGRID_MAIL_SEND_URL = "https://api.sendgrid.com/v3/mail/send"
+
+@lru_cache(maxsize=None)
+def _get_gmail_service():
+    """Import and initialize the Gmail service on first use"""
     from services.gmail_service import gmail_service
-    GMAIL_AVAILABLE = True
-except ImportError:
-    GMAIL_AVAILABLE = False
-    print("WARNING: Gmail API not available")
-
-# Optional sendgrid imports - fallback to console if not available
-try:
-    from sendgrid import SendGridAPIClient
-    from sendgrid.helpers.mail import Mail, From, To, Subject, Content
-    SENDGRID_AVAILABLE = True
-except ImportError:
-    SENDGRID_AVAILABLE = False
-    print("WARNING: SendGrid not available - emails will be printed to console")
+    return gmail_service
+
+@lru_cache(maxsize=None)
+def _get_sendgrid_http_client() -> httpx.Client:
+    """Return the shared keep-alive HTTP client for SendGrid, creating it on first use"""
+    return httpx.Client(
+        timeout=SENDGRID_TIMEOUT,
+        limits=httpx.Limits(max_keepalive_connections=8, max_connections=16)
+    )
+
+@lru_cache(maxsize=None)
+def _sendgrid_from(from_email: str, from_name: str):
+    """Build the SendGrid sender once; Mail keeps a reference and never modifies it"""
+    from sendgrid.helpers.mail import From
+    return From(from_email, from_name)
+
+@lru_cache(maxsize=None)
+def _sendgrid_subject(subject: str):
+    """Build a SendGrid subject once per distinct subject line"""
+    from sendgrid.helpers.mail import Subject
+    return Subject(subject)
+
+@dataclass(frozen=True)
+class SendResult:
+    """
+    Outcome of a SendGrid request
+    
+    Truthy when SendGrid accepted the message. On failure, retryable tells a
+    transient error (429, 5xx, network) that outlasted our own retries apart
+    from a permanent rejection that will fail again if re-sent.
+    """
+    ok: bool
+    retryable: bool = False
+    status: Optional[int] = None
+    error: Optional[str] = None
+    
+    def __bool__(self) -> bool:
+        return self.ok
+
+def _send_sendgrid_message(api_key: str, message) -> SendResult:
+    """
+    Send a prepared SendGrid message, retrying 429, 5xx and network errors
+    
+    The message is serialized once and the body reused across attempts, with
+    exponential backoff between them. Other 4xx responses are not retried.
+    A failure is logged here once; callers act on the returned SendResult.
+    """
+    client = _get_sendgrid_http_client()
+    body = message.get()
+    headers = {'Authorization': f'Bearer {api_key}'}
+    for attempt in range(SENDGRID_MAX_ATTEMPTS):
+        error = None
+        try:
+            status_code = client.post(SENDGRID_MAIL_SEND_URL, json=body, headers=headers).status_code
+        except httpx.RequestError as e:
+            logger.debug("SendGrid network error on attempt %s: %s", attempt + 1, e)
+            status_code, error = None, str(e)
+        
+        result = _send_result(status_code, error)
+        if result.ok:
+            return result
+        if not result.retryable:
+            logger.warning("SendGrid rejected the message with status code %s", status_code)
+            return result
+        
+        if attempt + 1 < SENDGRID_MAX_ATTEMPTS:
+            time.sleep(SENDGRID_RETRY_BASE_DELAY * 2 ** attempt)
+    
+    logger.warning("SendGrid send failed after %s attempts (last status %s)", SENDGRID_MAX_ATTEMPTS, status_code)
+    return result
+
+def _send_result(status_code: Optional[int], error: Optional[str] = None) -> SendResult:
+    """Classify one SendGrid attempt by its HTTP status (None for a network error)"""
+    if status_code in (200, 201, 202):
+        return SendResult(ok=True, status=status_code)
+    if not _is_retryable_status(status_code):
+        return SendResult(ok=False, status=status_code, error=error or f"HTTP {status_code}")
+    return SendResult(ok=False, retryable=True, status=status_code, error=error or f"HTTP {status_code}")
+
+def _is_retryable_status(status_code: Optional[int]) -> bool:
+    """Network errors (no status), 429 and 5xx are worth another attempt"""
+    return status_code is None or status_code == 429 or status_code >= 500
 
 # Import AI-powered university detection service
 from services.university_detection import university_service
 
+# Verification and password reset codes are valid for one hour. Expiries are
+# naive UTC to match what Motor returns and the datetime.utcnow() comparisons
+# in the routes
+CODE_EXPIRY = timedelta(hours=1)
+
 # Legacy college domain mapping (fallback for known institutions)
-LEGACY_COLLEGE_DOMAINS = {
+_LEGACY_COLLEGE_DOMAINS = {
     'pomona.edu': 'Pomona College',
     'hmc.edu': 'Harvey Mudd College',
     'scrippscollege.edu': 'Scripps College',
@@ -35,92 +158,95 @@ LEGACY_COLLEGE_DOMAINS = {
     'andrew.cmu.edu': 'Carnegie Mellon University'
 }
 
-def validate_college_email(email: str) -> Dict[str, any]:
-    """
-    Enhanced email validation with AI-powered university detection
-    
-    This function now uses Groq AI to detect universities from any .edu domain,
-    with fallback to legacy hardcoded mappings for known institutions.
-    """
+# Read-only view; only these fixed keys are interned. Domains parsed from
+# requests are not, since interned strings are never freed
+LEGACY_COLLEGE_DOMAINS = MappingProxyType({
+    sys.intern(domain): college for domain, college in _LEGACY_COLLEGE_DOMAINS.items()
+})
+
+# Community names for the legacy colleges, matching routes/communities.py
+_LEGACY_SHORT_NAMES = {
+    'Pomona College': 'Pomona',
+    'Harvey Mudd College': 'Harvey Mudd',
+    'Scripps College': 'Scripps',
+    'Pitzer College': 'Pitzer',
+    'Claremont McKenna College': 'CMC',
+    'Carnegie Mellon University': 'CMU'
+}
+
+# university_info for each legacy domain, built once instead of per signup.
+# Every signup shares these, so they are read-only too. The 'legacy' flag sends
+# these users to the hardcoded community lists in routes/communities.py
+LEGACY_COLLEGE_INFO = MappingProxyType({
+    domain: MappingProxyType({
+        'university_name': college,
+        'short_name': _LEGACY_SHORT_NAMES[college],
+        'legacy': True
+    })
+    for domain, college in LEGACY_COLLEGE_DOMAINS.items()
+})
+
+# SendGrid settings are read once at import (main.py loads .env before importing
+# the routes); call reload_email_config() after changing them, e.g. in tests
+_SENDGRID_API_KEY: Optional[str] = None
+_FROM_EMAIL: Optional[str] = None
+_FROM_NAME = 'Campus Mobility'
+_SENDGRID_ENABLED = False
+
+def reload_email_config() -> None:
+    """Re-read SendGrid settings from the environment"""
+    global _SENDGRID_API_KEY, _FROM_EMAIL, _FROM_NAME, _SENDGRID_ENABLED
+    _SENDGRID_API_KEY = os.getenv('SENDGRID_API_KEY')
+    _FROM_EMAIL = os.getenv('SENDGRID_FROM_EMAIL')
+    _FROM_NAME = os.getenv('SENDGRID_FROM_NAME') or 'Campus Mobility'
+    _SENDGRID_ENABLED = SENDGRID_AVAILABLE and bool(_SENDGRID_API_KEY) and bool(_FROM_EMAIL)
+
+reload_email_config()
+
+# Email delivery runs on a small thread pool so request handlers never wait on Gmail/SendGrid
+_EMAIL_EXECUTOR = ThreadPoolExecutor(max_workers=8, thread_name_prefix="email")
+
+# Addresses that were sent a verification code in the last VERIFICATION_RESEND_WINDOW seconds
+VERIFICATION_RESEND_WINDOW = 30
+_recent_verification_sends = TTLCache(maxsize=10000, ttl=VERIFICATION_RESEND_WINDOW)
+_recent_verification_lock = threading.Lock()
+
+# Queued verification emails are grouped for up to VERIFICATION_BATCH_WINDOW
+# seconds or VERIFICATION_BATCH_SIZE recipients, whichever comes first
+VERIFICATION_BATCH_SIZE = 100
+VERIFICATION_BATCH_WINDOW = 0.25
+_verification_queue: "queue.Queue[Tuple[str, str, str, int]]" = queue.Queue()
+
+# A batch that still fails transiently after _send_sendgrid_message's own
+# retries goes back on the queue, up to this many times per email
+VERIFICATION_MAX_REQUEUES = 2
+
+# Put on the queue at exit so the batcher sends what it holds and returns;
+# exit waits at most VERIFICATION_SHUTDOWN_TIMEOUT seconds for that
+_STOP_BATCHER = object()
+VERIFICATION_SHUTDOWN_TIMEOUT = 30
+_verification_batcher: Optional[threading.Thread] = None
+_verification_batcher_lock = threading.Lock()
+
+def _log_background_send(kind: str, email: str, future: Future) -> None:
+    """Log the outcome of an email sent on the background executor"""
     try:
-        # Try AI-powered detection first
-        result = university_service.validate_university_email(email)
-        
-        if result['valid']:
-            # Transform AI result to match legacy format
-            return {
-                'valid': True,
-                'college': result['university_name'],
-                'university_info': result  # Include full AI data
-            }
-        else:
-            # Fallback to legacy mapping for known domains
-            domain = email.split('@')[1].lower() if '@' in email else ''
-            
-            if not domain.endswith('.edu'):
-                return {
-                    'valid': False,
-                    'error': 'Only .edu email addresses are allowed'
-                }
-            
-            college = LEGACY_COLLEGE_DOMAINS.get(domain)
-            if college:
-                return {
-                    'valid': True,
-                    'college': college,
-                    'university_info': {
-                        'university_name': college,
-                        'short_name': college.split(' ')[0],  # Simple short name
-                        'legacy': True
-                    }
-                }
-            else:
-                return {
-                    'valid': False,
-                    'error': f'Email domain not recognized. We now support all universities - please contact support if this error persists.'
-                }
-                
+        if not future.result():
+            logger.warning("%s email to %s was not sent", kind, email)
     except Exception as e:
-        logging.error(f"Error in email validation: {e}")
-        
-        # Ultimate fallback to legacy system
-        domain = email.split('@')[1].lower() if '@' in email else ''
-        
-        if not domain.endswith('.edu'):
-            return {
-                'valid': False,
-                'error': 'Only .edu email addresses are allowed'
-            }
-        
-        college = LEGACY_COLLEGE_DOMAINS.get(domain)
-        if college:
-            return {
-                'valid': True,
-                'college': college,
-                'university_info': {
-                    'university_name': college,
-                    'short_name': college.split(' ')[0],
-                    'legacy': True,
-                    'fallback': True
-                }
-            }
-        else:
-            return {
-                'valid': False,
-                'error': 'University detection service temporarily unavailable. Please try again later.'
-            }
+        logger.error("%s email to %s failed: %s", kind, email, e)
 
-def generate_verification_code() -> str:
-    """Generate a 6-digit verification code"""
-    return ''.join(random.choices(string.digits, k=6))
+# Set EMAIL_PRETTY_HTML=1 to send the indented templates when debugging locally
+EMAIL_PRETTY_HTML = os.getenv('EMAIL_PRETTY_HTML', '').lower() in ('1', 'true', 'yes')
 
-def get_verification_expiry() -> datetime:
-    """Get expiry time for verification code (1 hour from now)"""
-    return datetime.utcnow() + timedelta(hours=1)
+def _minify_html(markup: str) -> str:
+    """Collapse template whitespace; none of our markup is whitespace-sensitive"""
+    if EMAIL_PRETTY_HTML:
+        return markup
+    return re.sub(r'\s+', ' ', markup).replace('> <', '><').strip()
 
-def create_verification_email_html(code: str, college: str) -> str:
-    """Create HTML-formatted verification email"""
-    html = f"""
+# Email templates are built once at import; only $code and $college vary per send
+_VERIFICATION_EMAIL_TEMPLATE = string.Template(_minify_html("""
     <!DOCTYPE html>
     <html lang="en">
     <head>
@@ -128,50 +254,50 @@ def create_verification_email_html(code: str, college: str) -> str:
         <meta name="viewport" content="width=device-width, initial-scale=1.0">
         <title>Campus Mobility - Email Verification</title>
         <style>
-            body {{
+            body {
                 font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
                 background-color: #f5f5f5;
                 margin: 0;
                 padding: 20px;
                 line-height: 1.6;
-            }}
-            .container {{
+            }
+            .container {
                 max-width: 600px;
                 margin: 0 auto;
                 background-color: #ffffff;
                 border-radius: 10px;
                 box-shadow: 0 4px 6px rgba(0, 0, 0, 0.1);
                 overflow: hidden;
-            }}
-            @media only screen and (max-width: 600px) {{
-                .container {{
+            }
+            @media only screen and (max-width: 600px) {
+                .container {
                     margin: 10px;
                     max-width: calc(100% - 20px);
-                }}
-                .content {{
+                }
+                .content {
                     padding: 20px 15px !important;
-                }}
-                .verification-code {{
+                }
+                .verification-code {
                     font-size: 24px !important;
                     letter-spacing: 3px !important;
-                }}
-            }}
-            .header {{
+                }
+            }
+            .header {
                 background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
                 color: white;
                 padding: 30px;
                 text-align: center;
-            }}
-            .header h1 {{
+            }
+            .header h1 {
                 margin: 0;
                 font-size: 28px;
                 font-weight: 300;
-            }}
-            .content {{
+            }
+            .content {
                 padding: 40px 30px;
                 text-align: center;
-            }}
-            .verification-code {{
+            }
+            .verification-code {
                 background-color: #f8f9fa;
                 border: 2px dashed #667eea;
                 border-radius: 10px;
@@ -182,34 +308,34 @@ def create_verification_email_html(code: str, college: str) -> str:
                 color: #667eea;
                 letter-spacing: 5px;
                 font-family: 'Courier New', monospace;
-            }}
-            .college-info {{
+            }
+            .college-info {
                 background-color: #e3f2fd;
                 border-left: 4px solid #2196f3;
                 padding: 15px;
                 margin: 20px 0;
                 border-radius: 5px;
-            }}
-            .footer {{
+            }
+            .footer {
                 background-color: #f8f9fa;
                 padding: 20px;
                 text-align: center;
                 color: #6c757d;
                 font-size: 14px;
-            }}
-            .expiry-notice {{
+            }
+            .expiry-notice {
                 color: #dc3545;
                 font-weight: bold;
                 margin: 20px 0;
-            }}
-            .instructions {{
+            }
+            .instructions {
                 background-color: #fff3cd;
                 border: 1px solid #ffeaa7;
                 border-radius: 5px;
                 padding: 15px;
                 margin: 20px 0;
                 color: #856404;
-            }}
+            }
         </style>
     </head>
     <body>
@@ -224,7 +350,7 @@ def create_verification_email_html(code: str, college: str) -> str:
                 <p>Thank you for joining our ride-sharing community. To complete your registration, please verify your email address.</p>
                 
                 <div class="college-info">
-                    <strong>📚 College:</strong> {college}
+                    <strong>📚 College:</strong> $college
                 </div>
                 
                 <div class="instructions">
@@ -233,7 +359,7 @@ def create_verification_email_html(code: str, college: str) -> str:
                 </div>
                 
                 <div class="verification-code">
-                    {code}
+                    $code
                 </div>
                 
                 <div class="expiry-notice">
@@ -258,107 +384,9 @@ def create_verification_email_html(code: str, college: str) -> str:
         </div>
     </body>
     </html>
-    """
-    return html
+    """))
 
-def send_verification_email(email: str, code: str, college: str) -> bool:
-    """Send verification email using Gmail API (preferred) or SendGrid API (fallback)"""
-    
-    # Try Gmail API first
-    if GMAIL_AVAILABLE and gmail_service.service:
-        logging.info("Attempting to send verification email via Gmail API")
-        success = gmail_service.send_verification_email(email, code, college)
-        if success:
-            logging.info(f"Verification email sent successfully to {email} via Gmail API")
-            return True
-        else:
-            logging.warning("Gmail API failed, falling back to SendGrid")
-    
-    # Fall back to SendGrid
-    if SENDGRID_AVAILABLE:
-        logging.info("Attempting to send verification email via SendGrid")
-        return _send_verification_email_sendgrid(email, code, college)
-    
-    # Final fallback: Console output
-    logging.warning("No email service available, falling back to console output")
-    print(f"=== EMAIL VERIFICATION (CONSOLE FALLBACK) ===")
-    print(f"To: {email}")
-    print(f"College: {college}")
-    print(f"Verification Code: {code}")
-    print(f"============================================")
-    return True
-
-def _send_verification_email_sendgrid(email: str, code: str, college: str) -> bool:
-    """Send verification email using SendGrid API"""
-    
-    # Get SendGrid configuration from environment variables
-    sendgrid_api_key = os.getenv('SENDGRID_API_KEY')
-    from_email = os.getenv('SENDGRID_FROM_EMAIL')
-    from_name = os.getenv('SENDGRID_FROM_NAME', 'Campus Mobility')
-    
-    # Check if credentials are configured
-    if not sendgrid_api_key or not from_email:
-        logging.warning("SendGrid credentials not configured")
-        return False
-    
-    try:
-        # Create plain text version as fallback
-        text_body = f"""
-        Welcome to Campus Mobility!
-        
-        Thank you for joining our ride-sharing community for the Claremont Colleges.
-        
-        Your verification code is: {code}
-        College: {college}
-        
-        This code will expire in 1 hour.
-        
-        If you didn't request this verification, please ignore this email.
-        
-        Thanks,
-        Campus Mobility Team
-        Connecting students across the 5C community
-        """
-        
-        # Create HTML version
-        html_body = create_verification_email_html(code, college)
-        
-        # Create SendGrid message
-        message = Mail(
-            from_email=From(from_email, from_name),
-            to_emails=To(email),
-            subject=Subject("🚗 Campus Mobility - Verify Your Email"),
-            plain_text_content=Content("text/plain", text_body.strip()),
-            html_content=Content("text/html", html_body)
-        )
-        
-        # Send email using SendGrid
-        sg = SendGridAPIClient(api_key=sendgrid_api_key)
-        response = sg.send(message)
-        
-        # Check if email was sent successfully
-        if response.status_code in [200, 201, 202]:
-            logging.info(f"Verification email sent successfully to {email} via SendGrid")
-            return True
-        else:
-            logging.warning(f"SendGrid returned status code {response.status_code}")
-            return False
-        
-    except Exception as e:
-        logging.error(f"SendGrid API error: {e}")
-        return False
-
-def generate_reset_code() -> str:
-    """Generate a 6-digit password reset code"""
-    return ''.join(random.choices(string.digits, k=6))
-
-def get_reset_expiry() -> datetime:
-    """Get expiry time for password reset code (1 hour from now)"""
-    return datetime.utcnow() + timedelta(hours=1)
-
-def create_password_reset_email_html(code: str, college: str) -> str:
-    """Create HTML-formatted password reset email"""
-    html = f"""
+_PASSWORD_RESET_EMAIL_TEMPLATE = string.Template(_minify_html("""
     <!DOCTYPE html>
     <html lang="en">
     <head>
@@ -366,51 +394,51 @@ def create_password_reset_email_html(code: str, college: str) -> str:
         <meta name="viewport" content="width=device-width, initial-scale=1.0">
         <title>Campus Mobility - Password Reset</title>
         <style>
-            body {{
+            body {
                 font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
                 background-color: #f5f5f5;
                 margin: 0;
                 padding: 20px;
                 line-height: 1.6;
-            }}
-            .container {{
+            }
+            .container {
                 max-width: 600px;
                 margin: 0 auto;
                 background-color: white;
                 border-radius: 10px;
                 box-shadow: 0 4px 6px rgba(0, 0, 0, 0.1);
                 overflow: hidden;
-            }}
-            .header {{
+            }
+            .header {
                 background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
                 color: white;
                 padding: 30px;
                 text-align: center;
-            }}
-            .header h1 {{
+            }
+            .header h1 {
                 margin: 0;
                 font-size: 28px;
                 font-weight: bold;
-            }}
-            .header p {{
+            }
+            .header p {
                 margin: 5px 0 0 0;
                 opacity: 0.9;
                 font-size: 16px;
-            }}
-            .content {{
+            }
+            .content {
                 padding: 30px;
-            }}
-            .content h2 {{
+            }
+            .content h2 {
                 color: #333;
                 margin-top: 0;
                 font-size: 24px;
-            }}
-            .content p {{
+            }
+            .content p {
                 color: #666;
                 margin-bottom: 20px;
                 font-size: 16px;
-            }}
-            .reset-code {{
+            }
+            .reset-code {
                 background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
                 color: white;
                 font-size: 32px;
@@ -421,45 +449,45 @@ def create_password_reset_email_html(code: str, college: str) -> str:
                 letter-spacing: 4px;
                 margin: 25px 0;
                 box-shadow: 0 4px 6px rgba(0, 0, 0, 0.1);
-            }}
-            .college-info {{
+            }
+            .college-info {
                 background-color: #e3f2fd;
                 border-left: 4px solid #2196f3;
                 padding: 15px;
                 margin: 20px 0;
                 border-radius: 5px;
                 color: #1565c0;
-            }}
-            .instructions {{
+            }
+            .instructions {
                 background-color: #fff3e0;
                 border-left: 4px solid #ff9800;
                 padding: 15px;
                 margin: 20px 0;
                 border-radius: 5px;
                 color: #e65100;
-            }}
-            .expiry-notice {{
+            }
+            .expiry-notice {
                 background-color: #fff9c4;
                 border-left: 4px solid #fbc02d;
                 border-radius: 5px;
                 padding: 15px;
                 margin: 20px 0;
                 color: #856404;
-            }}
-            .footer {{
+            }
+            .footer {
                 background-color: #f8f9fa;
                 padding: 20px;
                 text-align: center;
                 color: #6c757d;
-            }}
-            .security-notice {{
+            }
+            .security-notice {
                 background-color: #ffebee;
                 border-left: 4px solid #f44336;
                 padding: 15px;
                 margin: 20px 0;
                 border-radius: 5px;
                 color: #c62828;
-            }}
+            }
         </style>
     </head>
     <body>
@@ -474,7 +502,7 @@ def create_password_reset_email_html(code: str, college: str) -> str:
                 <p>We received a request to reset the password for your Campus Mobility account.</p>
                 
                 <div class="college-info">
-                    <strong>📚 College:</strong> {college}
+                    <strong>📚 College:</strong> $college
                 </div>
                 
                 <div class="instructions">
@@ -483,7 +511,7 @@ def create_password_reset_email_html(code: str, college: str) -> str:
                 </div>
                 
                 <div class="reset-code">
-                    {code}
+                    $code
                 </div>
                 
                 <div class="expiry-notice">
@@ -511,89 +539,563 @@ def create_password_reset_email_html(code: str, college: str) -> str:
         </div>
     </body>
     </html>
+    """))
+
+# Plain-text alternatives, dedented and stripped once here instead of per send
+_VERIFICATION_TEXT_TEMPLATE = string.Template(textwrap.dedent("""
+    Welcome to Campus Mobility!
+    
+    Thank you for joining our ride-sharing community for the Claremont Colleges.
+    
+    Your verification code is: $code
+    College: $college
+    
+    This code will expire in 1 hour.
+    
+    If you didn't request this verification, please ignore this email.
+    
+    Thanks,
+    Campus Mobility Team
+    Connecting students across the 5C community
+    """).strip())
+
+_PASSWORD_RESET_TEXT_TEMPLATE = string.Template(textwrap.dedent("""
+    Campus Mobility - Password Reset Request
+    
+    We received a request to reset the password for your Campus Mobility account.
+    
+    College: $college
+    Reset Code: $code
+    
+    This code will expire in 1 hour.
+    
+    If you didn't request this password reset, please ignore this email.
+    
+    Campus Mobility Team
+    """).strip())
+
+# Rejections are shared read-only constants so failed validations allocate nothing
+_ERR_NOT_EDU = MappingProxyType({
+    'valid': False,
+    'error': 'Only .edu email addresses are allowed'
+})
+_ERR_UNKNOWN_DOMAIN = MappingProxyType({
+    'valid': False,
+    'error': 'Email domain not recognized. We now support all universities - please contact support if this error persists.'
+})
+_ERR_DETECTION_UNAVAILABLE = MappingProxyType({
+    'valid': False,
+    'error': 'University detection service temporarily unavailable. Please try again later.'
+})
+
+# Domains the AI service recently said are not universities. university_service
+# already caches recognized universities for 7 days but not rejections, so
+# without this every signup attempt from such a domain would call Groq again.
+# Failed lookups are never cached; entries expire after 5 minutes so a wrong
+# verdict doesn't stick for long
+_negative_domain_cache = TTLCache(maxsize=1024, ttl=300)
+_negative_domain_cache_lock = threading.Lock()
+
+# Domain suffixes we accept sign-ups from; the email regex is built from this
+# tuple, so it is the one place to change when another suffix is allowed
+_ALLOWED_EMAIL_SUFFIXES = ('edu',)
+
+# Matches (with fullmatch) a single-@ address on an allowed domain; group 1 is
+# the domain. The local part is left to EmailStr, which accepts e.g. o'brien@
+_EDU_EMAIL_RE = re.compile(
+    r'[^@\s]+@([a-z0-9.-]+\.(?:%s))' % '|'.join(map(re.escape, _ALLOWED_EMAIL_SUFFIXES)),
+    re.IGNORECASE
+)
+
+@lru_cache(maxsize=4096)
+def _edu_domain(email: str) -> Optional[str]:
+    """Return the lowercase .edu domain of a well-formed address, or None"""
+    match = _EDU_EMAIL_RE.fullmatch(email)
+    return match.group(1).lower() if match else None
+
+def _legacy_validate(domain: str) -> Optional[Dict[str, any]]:
+    """Validate a lowercase domain against the legacy mapping, or None if unknown"""
+    info = LEGACY_COLLEGE_INFO.get(domain)
+    if info is None:
+        return None
+    return {
+        'valid': True,
+        'college': info['university_name'],
+        'university_info': info
+    }
+
+def _cached_rejection(domain: str) -> Optional[Mapping[str, any]]:
+    """Return the cached rejection for a domain the AI service recently said is not a university"""
+    with _negative_domain_cache_lock:
+        return _negative_domain_cache.get(domain)
+
+def validate_college_email(email: str) -> Mapping[str, any]:
+    """
+    Enhanced email validation with AI-powered university detection
+    
+    Known institutions are resolved from the legacy hardcoded mapping first,
+    so only unrecognized .edu domains pay for a Groq AI lookup.
+    """
+    # Check the address shape and reject non-.edu domains in a single pass
+    domain = _edu_domain(email)
+    if domain is None:
+        return _ERR_NOT_EDU
+    
+    # Known domains never need the AI service
+    legacy_result = _legacy_validate(domain)
+    if legacy_result:
+        return legacy_result
+    
+    rejection = _cached_rejection(domain)
+    if rejection is not None:
+        return rejection
+    
+    # Fall back to AI-powered detection for unknown domains. The service
+    # reports its own failures as results rather than raising
+    result = university_service.validate_university_email(email)
+    
+    if result['valid']:
+        # Transform AI result to match legacy format
+        return {
+            'valid': True,
+            'college': result['university_name'],
+            'university_info': result  # Include full AI data
+        }
+    elif result.get('service_error'):
+        # The lookup itself failed (e.g. a Groq 429); let the next signup retry it
+        return _ERR_DETECTION_UNAVAILABLE
+    else:
+        with _negative_domain_cache_lock:
+            _negative_domain_cache[domain] = _ERR_UNKNOWN_DOMAIN
+        return _ERR_UNKNOWN_DOMAIN
+
+# One lock per unknown domain so concurrent first-time signups share a single AI
+# lookup, with a count of the requests using it. The entry is removed once the
+# last of them finishes, so the dict only holds domains being looked up right now
+_domain_locks: Dict[str, List] = {}
+
+async def validate_college_email_async(email: str) -> Mapping[str, any]:
+    """
+    Async variant of validate_college_email for request handlers
+    
+    Unknown domains are looked up in a worker thread instead of blocking the
+    event loop. Concurrent signups from the same new domain wait on one lookup
+    and then hit university_service's per-domain cache.
+    """
+    domain = _edu_domain(email)
+    if (domain is not None and domain not in LEGACY_COLLEGE_DOMAINS
+            and _cached_rejection(domain) is None):
+        entry = _domain_locks.setdefault(domain, [asyncio.Lock(), 0])
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                return await asyncio.to_thread(validate_college_email, email)
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del _domain_locks[domain]
+    
+    return validate_college_email(email)
+
+def _generate_six_digit_code() -> str:
+    """Draw a zero-padded 6-digit code from the OS CSPRNG in a single call"""
+    return f"{secrets.randbelow(1_000_000):06d}"
+
+def generate_verification_code() -> str:
+    """Generate a 6-digit verification code"""
+    return _generate_six_digit_code()
+
+def get_verification_expiry() -> datetime:
+    """Get expiry time for verification code (1 hour from now)"""
+    return datetime.utcnow() + CODE_EXPIRY
+
+def create_verification_email_html(code: str, college: str) -> str:
+    """Create HTML-formatted verification email"""
+    return _VERIFICATION_EMAIL_TEMPLATE.substitute(code=code, college=html.escape(college))
+
+def create_verification_email_text(code: str, college: str) -> str:
+    """Create plain text verification email"""
+    return _VERIFICATION_TEXT_TEMPLATE.substitute(code=code, college=college)
+
+def claim_verification_send(email: str) -> bool:
+    """
+    Record that a verification code is about to be sent to this address
+    
+    Returns False if one was already sent within VERIFICATION_RESEND_WINDOW
+    seconds; callers should then keep the existing code rather than issue and
+    email a new one, so double-clicks and resend storms cost nothing.
+    """
+    key = email.lower()
+    with _recent_verification_lock:
+        if key in _recent_verification_sends:
+            return False
+        _recent_verification_sends[key] = True
+        return True
+
+def send_verification_email(email: str, code: str, college: str, force_immediate: bool = False) -> bool:
+    """
+    Queue a verification email for background delivery and return immediately
+    
+    The provider is picked on the email thread pool, since the first check
+    initializes the Gmail service (a blocking OAuth refresh) and callers are
+    usually async request handlers. Pass force_immediate=True to send
+    synchronously and get the real result.
     """
-    return html
+    if force_immediate:
+        return _send_verification_email_sync(email, code, college)
+    
+    future = _EMAIL_EXECUTOR.submit(_dispatch_verification_email, email, code, college)
+    future.add_done_callback(partial(_log_background_send, "Verification", email))
+    return True
+
+def _dispatch_verification_email(email: str, code: str, college: str) -> bool:
+    """
+    Queue the email for batching when SendGrid is the provider in use, else send it now
+    
+    Runs on the email thread pool, so Gmail sends still run in parallel.
+    """
+    if not _use_sendgrid_batches():
+        return _send_verification_email_sync(email, code, college)
+    
+    _start_verification_batcher()
+    _verification_queue.put((email, code, college, 0))
+    return True
+
+def _use_sendgrid_batches() -> bool:
+    """True when SendGrid is the provider in use; Gmail stays preferred whenever it is up"""
+    if not _SENDGRID_ENABLED:
+        return False
+    gmail_service = _get_gmail_service() if GMAIL_AVAILABLE else None
+    return gmail_service is None or gmail_service.service is None
+
+def _start_verification_batcher() -> None:
+    """Start the background thread that drains the verification queue, once"""
+    global _verification_batcher
+    with _verification_batcher_lock:
+        if _verification_batcher is None:
+            _verification_batcher = threading.Thread(
+                target=_run_verification_batcher, name="email-batcher", daemon=True
+            )
+            _verification_batcher.start()
+
+def _next_verification_batch() -> Tuple[List[Tuple[str, str, str, int]], bool]:
+    """
+    Block for one queued email, then collect more until the batch is full or the window closes
+    
+    The flag is True once the stop sentinel has been taken; the batcher then
+    sends what it collected and exits.
+    """
+    item = _verification_queue.get()
+    if item is _STOP_BATCHER:
+        return [], True
+    
+    batch = [item]
+    deadline = time.monotonic() + VERIFICATION_BATCH_WINDOW
+    while len(batch) < VERIFICATION_BATCH_SIZE:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        try:
+            item = _verification_queue.get(timeout=remaining)
+        except queue.Empty:
+            break
+        if item is _STOP_BATCHER:
+            return batch, True
+        batch.append(item)
+    return batch, False
+
+def _run_verification_batcher() -> None:
+    """Send queued verification emails in batches until told to stop"""
+    stopping = False
+    while not stopping:
+        batch, stopping = _next_verification_batch()
+        if batch:
+            _send_queued_verifications(batch)
+
+def _send_queued_verifications(batch: List[Tuple[str, str, str, int]]) -> None:
+    """
+    Send one batch taken off the queue, putting it back after a transient failure
+    
+    Each email is requeued at most VERIFICATION_MAX_REQUEUES times. Permanent
+    failures were already logged by the send itself.
+    """
+    recipients = [item[:3] for item in batch]
+    try:
+        if not _use_sendgrid_batches():
+            send_verification_emails_bulk(recipients)
+            return
+        result = _send_verification_batch(recipients)
+    except Exception as e:
+        logger.error("Batched verification send failed: %s", e)
+        return
+    
+    if result or not result.retryable:
+        return
+    
+    requeued = [
+        (email, code, college, requeues + 1)
+        for email, code, college, requeues in batch
+        if requeues < VERIFICATION_MAX_REQUEUES
+    ]
+    for item in requeued:
+        _verification_queue.put(item)
+    
+    if requeued:
+        logger.info("Requeued %s verification emails after a transient SendGrid failure (%s)",
+                    len(requeued), result.error)
+    if len(requeued) < len(batch):
+        logger.warning("Dropped %s verification emails after %s requeues (%s)",
+                       len(batch) - len(requeued), VERIFICATION_MAX_REQUEUES, result.error)
+
+def _stop_verification_batcher() -> None:
+    """
+    Stop the batcher at exit, then send anything still queued
+    
+    The batcher is a daemon thread, so without this the batch it is holding
+    would be dropped when the interpreter exits. It is asked to send that
+    batch and return, and is joined before the rest of the queue is drained.
+    """
+    global _verification_batcher
+    with _verification_batcher_lock:
+        batcher, _verification_batcher = _verification_batcher, None
+    if batcher is not None:
+        _verification_queue.put(_STOP_BATCHER)
+        batcher.join(VERIFICATION_SHUTDOWN_TIMEOUT)
+    
+    pending = []
+    while True:
+        try:
+            item = _verification_queue.get_nowait()
+        except queue.Empty:
+            break
+        if item is not _STOP_BATCHER:
+            pending.append(item[:3])
+    if pending:
+        send_verification_emails_bulk(pending)
+
+atexit.register(_stop_verification_batcher)
 
-def send_password_reset_email(email: str, reset_code: str, college: str) -> bool:
+def _send_verification_email_sync(email: str, code: str, college: str) -> bool:
+    """Send verification email using Gmail API (preferred) or SendGrid API (fallback)"""
+    
+    # Try Gmail API first
+    gmail_service = _get_gmail_service() if GMAIL_AVAILABLE else None
+    if gmail_service and gmail_service.service:
+        logger.info("Attempting to send verification email via Gmail API")
+        success = gmail_service.send_verification_email(email, code, college)
+        if success:
+            logger.info("Verification email sent successfully to %s via Gmail API", email)
+            return True
+        else:
+            logger.warning("Gmail API failed, falling back to SendGrid")
+    
+    # Fall back to SendGrid
+    if SENDGRID_AVAILABLE:
+        logger.info("Attempting to send verification email via SendGrid")
+        return _send_verification_email_sendgrid(email, code, college)
+    
+    # Final fallback: log the code so it can be read from the server output
+    return _log_verification_email(email, code, college)
+
+def _log_verification_email(email: str, code: str, college: str) -> bool:
+    """Log a verification email instead of sending it"""
+    logger.warning("EMAIL FALLBACK verification to=%s college=%s code=%s reason=%s",
+                   email, college, code, "no email service available")
+    return True
+
+# With neither provider installed every send ends in the log fallback, so skip
+# the provider checks entirely
+if not GMAIL_AVAILABLE and not SENDGRID_AVAILABLE:
+    _send_verification_email_sync = _log_verification_email
+
+def _send_verification_email_sendgrid(email: str, code: str, college: str) -> bool:
+    """Send verification email using SendGrid API"""
+    
+    if not _SENDGRID_ENABLED:
+        logger.warning("SendGrid credentials not configured")
+        return False
+    
+    from sendgrid.helpers.mail import Mail, To, Content
+    
+    try:
+        # Create plain text version as fallback
+        text_body = create_verification_email_text(code, college)
+        
+        # Create HTML version
+        html_body = create_verification_email_html(code, college)
+        
+        # Create SendGrid message
+        message = Mail(
+            from_email=_sendgrid_from(_FROM_EMAIL, _FROM_NAME),
+            to_emails=To(email),
+            subject=_sendgrid_subject(VERIFICATION_EMAIL_SUBJECT),
+            plain_text_content=Content("text/plain", text_body),
+            html_content=Content("text/html", html_body)
+        )
+        
+        # Send the prepared message, retrying transient failures
+        if _send_sendgrid_message(_SENDGRID_API_KEY, message):
+            logger.info("Verification email sent successfully to %s via SendGrid", email)
+            return True
+        return False
+        
+    except Exception as e:
+        logger.error("SendGrid API error: %s", e)
+        return False
+
+def send_verification_emails_bulk(recipients: List[Tuple[str, str, str]]) -> bool:
+    """
+    Send verification emails to many (email, code, college) recipients at once
+    
+    Every recipient becomes a personalization on a shared SendGrid message, so
+    N recipients cost ceil(N / 1000) API requests instead of N. Recipients are
+    sent one at a time when Gmail is available (it stays the preferred
+    provider) or when SendGrid isn't set up.
+    """
+    if not _use_sendgrid_batches():
+        results = [_send_verification_email_sync(email, code, college) for email, code, college in recipients]
+        return all(results)
+    
+    results = [
+        _send_verification_batch(recipients[start:start + SENDGRID_MAX_PERSONALIZATIONS])
+        for start in range(0, len(recipients), SENDGRID_MAX_PERSONALIZATIONS)
+    ]
+    return all(results)
+
+def _send_verification_batch(batch: List[Tuple[str, str, str]]) -> SendResult:
+    """
+    Send up to SENDGRID_MAX_PERSONALIZATIONS verification emails as one SendGrid message
+    
+    If SendGrid rejects the whole message outright (a non-retryable error,
+    e.g. one malformed recipient), every recipient is sent on their own so the
+    rest still get their code.
+    """
+    from sendgrid.helpers.mail import Mail, To, Content, Personalization, Substitution
+    
+    try:
+        # Render the bodies once with substitution tags; SendGrid fills them in per recipient
+        html_body = _VERIFICATION_EMAIL_TEMPLATE.substitute(code='-code-', college='-college_html-')
+        text_body = create_verification_email_text('-code-', '-college-')
+        message = Mail(
+            from_email=_sendgrid_from(_FROM_EMAIL, _FROM_NAME),
+            subject=_sendgrid_subject(VERIFICATION_EMAIL_SUBJECT),
+            plain_text_content=Content("text/plain", text_body),
+            html_content=Content("text/html", html_body)
+        )
+        for email, code, college in batch:
+            personalization = Personalization()
+            personalization.add_to(To(email))
+            personalization.add_substitution(Substitution('-code-', code))
+            personalization.add_substitution(Substitution('-college-', college))
+            personalization.add_substitution(Substitution('-college_html-', html.escape(college)))
+            message.add_personalization(personalization)
+        
+        result = _send_sendgrid_message(_SENDGRID_API_KEY, message)
+    except Exception as e:
+        logger.error("SendGrid API error during bulk send: %s", e)
+        result = SendResult(ok=False, error=str(e))
+    
+    if result:
+        logger.info("Bulk verification email sent to %s recipients via SendGrid", len(batch))
+        return result
+    if result.retryable:
+        return result
+    
+    logger.warning("Sending %s batched verification emails individually after the batch was rejected", len(batch))
+    sent = [_send_verification_email_sendgrid(email, code, college) for email, code, college in batch]
+    return SendResult(ok=all(sent), status=result.status, error=None if all(sent) else result.error)
+
+def generate_reset_code() -> str:
+    """Generate a 6-digit password reset code"""
+    return _generate_six_digit_code()
+
+def get_reset_expiry() -> datetime:
+    """Get expiry time for password reset code (1 hour from now)"""
+    return datetime.utcnow() + CODE_EXPIRY
+
+def create_password_reset_email_html(code: str, college: str) -> str:
+    """Create HTML-formatted password reset email"""
+    return _PASSWORD_RESET_EMAIL_TEMPLATE.substitute(code=code, college=html.escape(college))
+
+def create_password_reset_email_text(code: str, college: str) -> str:
+    """Create plain text password reset email"""
+    return _PASSWORD_RESET_TEXT_TEMPLATE.substitute(code=code, college=college)
+
+def send_password_reset_email(email: str, reset_code: str, college: str, force_immediate: bool = False) -> bool:
+    """
+    Queue a password reset email for background delivery and return immediately
+    
+    Pass force_immediate=True to send synchronously and get the real result.
+    """
+    if force_immediate:
+        return _send_password_reset_email_sync(email, reset_code, college)
+    
+    future = _EMAIL_EXECUTOR.submit(_send_password_reset_email_sync, email, reset_code, college)
+    future.add_done_callback(partial(_log_background_send, "Password reset", email))
+    return True
+
+def _send_password_reset_email_sync(email: str, reset_code: str, college: str) -> bool:
     """Send password reset email using Gmail API (preferred) or SendGrid API (fallback)"""
     
     # Try Gmail API first
-    if GMAIL_AVAILABLE and gmail_service.service:
-        logging.info("Attempting to send password reset email via Gmail API")
+    gmail_service = _get_gmail_service() if GMAIL_AVAILABLE else None
+    if gmail_service and gmail_service.service:
+        logger.info("Attempting to send password reset email via Gmail API")
         success = gmail_service.send_password_reset_email(email, reset_code, college)
         if success:
-            logging.info(f"Password reset email sent successfully to {email} via Gmail API")
+            logger.info("Password reset email sent successfully to %s via Gmail API", email)
             return True
         else:
-            logging.warning("Gmail API failed, falling back to SendGrid")
+            logger.warning("Gmail API failed, falling back to SendGrid")
     
     # Fall back to SendGrid
     if SENDGRID_AVAILABLE:
-        logging.info("Attempting to send password reset email via SendGrid")
+        logger.info("Attempting to send password reset email via SendGrid")
         return _send_password_reset_email_sendgrid(email, reset_code, college)
     
-    # Final fallback: Console output
-    logging.warning("No email service available, falling back to console output")
-    print(f"=== PASSWORD RESET EMAIL (CONSOLE FALLBACK) ===")
-    print(f"To: {email}")
-    print(f"College: {college}")
-    print(f"Reset Code: {reset_code}")
-    print(f"===============================================")
+    # Final fallback: log the code so it can be read from the server output
+    return _log_password_reset_email(email, reset_code, college)
+
+def _log_password_reset_email(email: str, reset_code: str, college: str) -> bool:
+    """Log a password reset email instead of sending it"""
+    logger.warning("EMAIL FALLBACK password_reset to=%s college=%s code=%s reason=%s",
+                   email, college, reset_code, "no email service available")
     return True
 
+if not GMAIL_AVAILABLE and not SENDGRID_AVAILABLE:
+    _send_password_reset_email_sync = _log_password_reset_email
+
 def _send_password_reset_email_sendgrid(email: str, reset_code: str, college: str) -> bool:
     """Send password reset email using SendGrid API"""
     
-    # Get SendGrid configuration
-    sendgrid_api_key = os.getenv('SENDGRID_API_KEY')
-    from_email = os.getenv('SENDGRID_FROM_EMAIL')
-    from_name = os.getenv('SENDGRID_FROM_NAME', 'Campus Mobility')
-    
-    if not sendgrid_api_key or not from_email:
-        logging.warning("SendGrid credentials not configured")
+    if not _SENDGRID_ENABLED:
+        logger.warning("SendGrid credentials not configured")
         return False
     
+    from sendgrid.helpers.mail import Mail, To, Content
+    
     try:
         # Create HTML email content
         html_body = create_password_reset_email_html(reset_code, college)
         
         # Create plain text version
-        text_body = f"""
-        Campus Mobility - Password Reset Request
-        
-        We received a request to reset the password for your Campus Mobility account.
-        
-        College: {college}
-        Reset Code: {reset_code}
-        
-        This code will expire in 1 hour.
-        
-        If you didn't request this password reset, please ignore this email.
-        
-        Campus Mobility Team
-        """
+        text_body = create_password_reset_email_text(reset_code, college)
         
         # Create SendGrid email message
         message = Mail(
-            from_email=From(from_email, from_name),
+            from_email=_sendgrid_from(_FROM_EMAIL, _FROM_NAME),
             to_emails=To(email),
-            subject=Subject("🔐 Campus Mobility - Password Reset Request"),
-            plain_text_content=Content("text/plain", text_body.strip()),
+            subject=_sendgrid_subject(PASSWORD_RESET_EMAIL_SUBJECT),
+            plain_text_content=Content("text/plain", text_body),
             html_content=Content("text/html", html_body)
         )
         
-        # Send email using SendGrid
-        sg = SendGridAPIClient(api_key=sendgrid_api_key)
-        response = sg.send(message)
-        
-        # Check if email was sent successfully
-        if response.status_code in [200, 201, 202]:
-            logging.info(f"Password reset email sent successfully to {email} via SendGrid")
+        # Send the prepared message, retrying transient failures
+        if _send_sendgrid_message(_SENDGRID_API_KEY, message):
+            logger.info("Password reset email sent successfully to %s via SendGrid", email)
             return True
-        else:
-            logging.warning(f"SendGrid returned status code {response.status_code}")
-            return False
+        return False
         
     except Exception as e:
-        logging.error(f"SendGrid API error: {e}")
+        logger.error("SendGrid API error: %s", e)
         return False
\ No newline at end of file
@@ -2,9 +2,25 @@
 
 import requests
 import json
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 API_BASE_URL = "http://172.28.119.64:8000"
 
+# (connect, read) seconds, so a stalled backend can't hang the script
+REQUEST_TIMEOUT = (3, 10)
+
+def make_session():
+    """Create a session that keeps one connection to the API alive across calls"""
+    session = requests.Session()
+    # Retry connection failures and gateway errors briefly; urllib3 does not
+    # retry POSTs on status codes, so login is never sent twice after a response
+    retry = Retry(total=2, backoff_factor=0.2, status_forcelist=[502, 503, 504])
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=4, max_retries=retry)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
 def test_api():
     print("=== Testing Ride Share API ===")
     
@@ -15,8 +31,9 @@ def test_api():
     }
     
     print("1. Testing login...")
+    session = make_session()
     try:
-        response = requests.post(f"{API_BASE_URL}/login", json=login_data)
+        response = session.post(f"{API_BASE_URL}/login", json=login_data, timeout=REQUEST_TIMEOUT)
         print(f"Login response status: {response.status_code}")
         
         if response.status_code == 200:
@@ -31,7 +48,7 @@ def test_api():
                 "Content-Type": "application/json"
             }
             
-            rides_response = requests.get(f"{API_BASE_URL}/ride-requests", headers=headers)
+            rides_response = session.get(f"{API_BASE_URL}/ride-requests", headers=headers, timeout=REQUEST_TIMEOUT)
             print(f"Rides response status: {rides_response.status_code}")
             
             if rides_response.status_code == 200:
@@ -46,7 +63,7 @@ def test_api():
                 
             # Test getting user profile
             print("\n3. Testing get profile...")
-            profile_response = requests.get(f"{API_BASE_URL}/profile", headers=headers)
+            profile_response = session.get(f"{API_BASE_URL}/profile", headers=headers, timeout=REQUEST_TIMEOUT)
             print(f"Profile response status: {profile_response.status_code}")
             
             if profile_response.status_code == 200:
@@ -62,6 +79,8 @@ def test_api():
         print(f"Network error: {e}")
     except Exception as e:
         print(f"Error: {e}")
+    finally:
+        session.close()
 
 if __name__ == "__main__":
     test_api()
\ No newline at end of file